@@ -175,12 +175,12 @@ def update_ftov_msgs(
     updates: Dict[Any, Union[np.ndarray, jnp.ndarray]],
     fg_state: fgraph.FactorGraphState,
 ) -> jnp.ndarray:
-  """Returns new ftov_msgs with updates for a set of variables or factor types.
+  """Returns new ftov_msgs with updates for a set of variables, variable groups or factor types.
 
   Args:
     ftov_msgs: A flat jnp array containing ftov_msgs.
-    updates: A dictionary mapping the variables or the factor types to their
-      ftov_msgs updates
+    updates: A dictionary mapping the variables, the variable groups or the
+      factor types to their ftov_msgs updates
     fg_state: Factor graph state
 
   Returns:
@@ -188,7 +188,8 @@ def update_ftov_msgs(
 
   Raises: ValueError if:
     (1) provided ftov_msgs shape does not match the expected ftov_msgs shape.
-    (2) provided variable or factor type is not in the FactorGraph.
+    (2) provided variable, variable group or factor type is not in the
+        FactorGraph.
   """
   # Copy to device and clip updates to not have infinite values
   updates = jax.tree_util.tree_map(
@@ -205,6 +206,42 @@ def update_ftov_msgs(
         )
       ftov_msgs = ftov_msgs.at[msgs_start:msgs_end].set(data)
 
+    elif name in fg_state.variable_groups:
+      # The data will only be flattened if it is of the expected size
+      flat_data = name.flatten(data)
+
+      # The variable states of a VarGroup occupy a contiguous range
+      first_variable = name.variables[0]
+      start_index = fg_state.vars_to_starts[first_variable]
+
+      var_states_for_edge_states = np.concatenate(
+          [
+              wiring_by_type.var_states_for_edges[..., 0]
+              for wiring_by_type in fg_state.wiring.values()
+          ]
+      )
+      local_var_states_for_edge_states = (
+          var_states_for_edge_states - start_index
+      )
+      edge_states_for_group = np.nonzero(
+          np.logical_and(
+              local_var_states_for_edge_states >= 0,
+              local_var_states_for_edge_states < flat_data.shape[0],
+          )
+      )[0]
+      local_var_states = local_var_states_for_edge_states[
+          edge_states_for_group
+      ]
+      # Spread the beliefs of each variable uniformly across all the factors
+      # to variable messages involving this variable
+      num_edges_per_var_state = np.bincount(
+          local_var_states, minlength=flat_data.shape[0]
+      )
+      ftov_msgs = ftov_msgs.at[edge_states_for_group].set(
+          flat_data[local_var_states]
+          / num_edges_per_var_state[local_var_states]
+      )
+
     elif name in fg_state.vars_to_starts:
       num_var_states = name[1]
       if data.shape != (num_var_states,):
@@ -0,0 +1,39 @@
+# Copyright 2023 DeepMind Technologies Limited.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Shared fixtures for the factor tests."""
+
+import pytest
+from pgmax import fgraph
+from pgmax import fgroup
+from pgmax import infer
+from pgmax import vgroup
+
+
+@pytest.fixture(scope="session", autouse=True)
+def warmup_jax_compilation_cache():
+  """Pre-warms the JAX compilation cache with a tiny representative graph.
+
+  Building and running BP on a single AND factor with 2 parents pays the
+  cold-start XLA compilation of the shared BP sub-kernels once, before the
+  tests of this directory run.
+  """
+  variables = vgroup.NDVarArray(num_states=2, shape=(3,))
+  fg = fgraph.FactorGraph(variable_groups=[variables])
+  fg.add_factors(
+      fgroup.ANDFactorGroup([[variables[0], variables[1], variables[2]]])
+  )
+  bp = infer.build_inferer(fg.bp_state, backend="bp")
+  bp_arrays = bp.run(bp.init(), num_iters=1, temperature=0.0)
+  bp.get_beliefs(bp_arrays)
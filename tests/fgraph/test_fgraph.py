@@ -193,6 +193,47 @@ def test_ftov_msgs():
         fg.fg_state,
     )
 
+  # Updating the ftov messages of a VarGroup is equivalent to updating the
+  # ftov messages of each of its variables. The graph below has two variable
+  # groups, so the updated group does not start at the first variable state,
+  # and varray[1] is involved in three factors, so its beliefs are spread
+  # across several edge states
+  varray = vgroup.NDVarArray(num_states=3, shape=(4,))
+  fg2 = fgraph.FactorGraph([vg, varray])
+  fg2.add_factors(
+      fgroup.EnumFactorGroup(
+          variables_for_factors=[[vg[0]]],
+          factor_configs=np.arange(10)[:, None],
+      )
+  )
+  fg2.add_factors(
+      fgroup.EnumFactorGroup(
+          variables_for_factors=[
+              [varray[0], varray[1]],
+              [varray[1], varray[2]],
+              [varray[1], varray[3]],
+          ],
+          factor_configs=np.array([[idx, idx] for idx in range(3)]),
+      )
+  )
+  init_ftov_msgs = jax.device_put(fg2.bp_state.ftov_msgs.value)
+  varray_data = np.arange(12.0).reshape(4, 3)
+
+  ftov_msgs_from_vgroup = infer.bp_state.update_ftov_msgs(
+      init_ftov_msgs,
+      {varray: jax.device_put(varray_data)},
+      fg2.fg_state,
+  )
+  ftov_msgs_from_vars = infer.bp_state.update_ftov_msgs(
+      init_ftov_msgs,
+      {
+          varray[idx]: jax.device_put(varray_data[idx])
+          for idx in range(varray.shape[0])
+      },
+      fg2.fg_state,
+  )
+  assert jnp.allclose(ftov_msgs_from_vgroup, ftov_msgs_from_vars)
+
 
 def test_evidence():
   """Test the correct implementation of evidence."""